@@ -0,0 +1,154 @@
+# backend/app/batching.py
+"""Micro-batching of query embeddings across concurrent requests.
+
+Request handlers run in FastAPI's threadpool; each one enqueues its text and
+blocks on a future. A collector thread gathers queued texts for up to
+EMBED_BATCH_MAX_WAIT_MS (or until EMBED_BATCH_MAX_SIZE) and hands them to a
+pool of EMBED_BATCH_CONCURRENCY workers, each sending one embedding call.
+When every worker is busy the collector waits, so texts keep queueing and the
+next batch is larger.
+
+`embed_fn` returns `(vectors, fell_back)` like `llm.embed_with_status`, so
+batches answered by the hashing fallback after a provider error (rate limits,
+timeouts) show up in the stats as `provider_fallbacks`.
+"""
+import os
+import queue
+import statistics
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Tuple
+
+from . import llm
+
+EMBED_BATCH_MAX_WAIT_MS = float(os.getenv("EMBED_BATCH_MAX_WAIT_MS", "5"))
+EMBED_BATCH_MAX_SIZE = int(os.getenv("EMBED_BATCH_MAX_SIZE", "64"))
+EMBED_BATCH_CONCURRENCY = int(os.getenv("EMBED_BATCH_CONCURRENCY", "4"))
+
+_SAMPLES = 1000  # recent batches kept for the metrics summary
+
+
+def _summary(values) -> Dict[str, float]:
+    if not values:
+        return {"avg": 0.0, "p50": 0.0, "p95": 0.0, "max": 0.0}
+    xs = sorted(values)
+    return {
+        "avg": round(statistics.fmean(xs), 3),
+        "p50": round(xs[len(xs) // 2], 3),
+        "p95": round(xs[max(0, int(len(xs) * 0.95) - 1)], 3),
+        "max": round(xs[-1], 3),
+    }
+
+
+class EmbedBatcher:
+    def __init__(
+        self,
+        embed_fn: Callable[[List[str]], Tuple[List[Any], bool]],
+        max_wait_ms: float = EMBED_BATCH_MAX_WAIT_MS,
+        max_batch: int = EMBED_BATCH_MAX_SIZE,
+        concurrency: int = EMBED_BATCH_CONCURRENCY,
+    ):
+        self._embed_fn = embed_fn
+        self._max_wait = max(0.0, max_wait_ms) / 1000.0
+        self._max_batch = max(1, max_batch)
+        self._concurrency = max(1, concurrency)
+        self._slots = threading.Semaphore(self._concurrency)
+        self._pool = ThreadPoolExecutor(max_workers=self._concurrency, thread_name_prefix="embed-batch")
+        self._queue: "queue.Queue[tuple]" = queue.Queue()
+        self._worker = None
+        self._lock = threading.Lock()
+        self._batches = 0
+        self._requests = 0
+        self._failed_batches = 0
+        self._provider_fallbacks = 0
+        self._in_flight = 0
+        self._batch_sizes: deque = deque(maxlen=_SAMPLES)
+        self._queue_waits_ms: deque = deque(maxlen=_SAMPLES)
+
+    def embed(self, text: str) -> Any:
+        fut: Future = Future()
+        self._queue.put((text, fut, time.perf_counter()))
+        self._ensure_worker()
+        return fut.result()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "max_wait_ms": self._max_wait * 1000.0,
+                "max_batch": self._max_batch,
+                "concurrency": self._concurrency,
+                "batches": self._batches,
+                "failed_batches": self._failed_batches,
+                "provider_fallbacks": self._provider_fallbacks,
+                "requests": self._requests,
+                "queued": self._queue.qsize(),
+                "in_flight": self._in_flight,
+                "batch_size": _summary(list(self._batch_sizes)),
+                "queue_wait_ms": _summary(list(self._queue_waits_ms)),
+            }
+
+    def _ensure_worker(self) -> None:
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="embed-batcher", daemon=True)
+                self._worker.start()
+
+    def _collect(self) -> List[tuple]:
+        first = self._queue.get()
+        batch = [first]
+        deadline = first[2] + self._max_wait
+        while len(batch) < self._max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining > 0:
+                    batch.append(self._queue.get(timeout=remaining))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            self._slots.acquire()
+            batch = self._collect()
+            sent = time.perf_counter()
+            with self._lock:
+                self._in_flight += 1
+                self._batches += 1
+                self._requests += len(batch)
+                self._batch_sizes.append(len(batch))
+                self._queue_waits_ms.extend((sent - queued) * 1000.0 for _, _, queued in batch)
+            self._pool.submit(self._send, batch)
+
+    def _send(self, batch: List[tuple]) -> None:
+        try:
+            vecs, fell_back = self._embed_fn([text for text, _, _ in batch])
+            if fell_back:
+                with self._lock:
+                    self._provider_fallbacks += 1
+            if len(vecs) != len(batch):
+                raise RuntimeError(f"embed returned {len(vecs)} vectors for {len(batch)} texts")
+        except Exception as e:
+            with self._lock:
+                self._failed_batches += 1
+            for _, fut, _ in batch:
+                fut.set_exception(e)
+        else:
+            for (_, fut, _), vec in zip(batch, vecs):
+                fut.set_result(vec)
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+            self._slots.release()
+
+
+query_batcher = EmbedBatcher(llm.embed_with_status)
+
+
+def embed_query(text: str) -> Any:
+    return query_batcher.embed(text)
@@ -0,0 +1,80 @@
+# backend/app/bench.py
+"""Latency benchmark for owner-filtered search.
+
+Run against a live Qdrant:  python -m app.bench --points 100000 --owner-share 0.01
+"""
+import argparse
+import random
+import statistics
+import time
+import uuid
+
+from qdrant_client.http.models import Distance, VectorParams, PointStruct
+
+from . import vectorstore as vs
+
+BENCH_COLLECTION = "ai_knowledge_hub_bench"
+
+
+def _rand_vec(dim: int):
+    return [random.random() for _ in range(dim)]
+
+
+def _timed(fn, runs: int):
+    samples = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.95) - 1]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--points", type=int, default=20000)
+    ap.add_argument("--dim", type=int, default=1536)
+    ap.add_argument("--owner-share", type=float, default=0.01)
+    ap.add_argument("--queries", type=int, default=100)
+    args = ap.parse_args()
+
+    client = vs.get_client()
+    try:
+        client.delete_collection(collection_name=BENCH_COLLECTION)
+    except Exception:
+        pass
+    client.create_collection(
+        collection_name=BENCH_COLLECTION,
+        vectors_config=VectorParams(size=args.dim, distance=Distance.COSINE),
+    )
+    for field, schema in vs.PAYLOAD_INDEXES.items():
+        client.create_payload_index(collection_name=BENCH_COLLECTION, field_name=field, field_schema=schema)
+
+    batch = []
+    for i in range(args.points):
+        owner = "small" if random.random() < args.owner_share else f"team-{i % 20}"
+        batch.append(PointStruct(id=str(uuid.uuid4()), vector=_rand_vec(args.dim), payload={"owner": owner}))
+        if len(batch) == 512:
+            client.upsert(collection_name=BENCH_COLLECTION, points=batch)
+            batch = []
+    if batch:
+        client.upsert(collection_name=BENCH_COLLECTION, points=batch)
+
+    q = _rand_vec(args.dim)
+    cases = {
+        "unfiltered": None,
+        "owner=small": vs.build_filter(owner="small"),
+        "owner=team-0": vs.build_filter(owner="team-0"),
+    }
+    for name, flt in cases.items():
+        p50, p95 = _timed(
+            lambda: client.search(collection_name=BENCH_COLLECTION, query_vector=q, query_filter=flt, limit=8),
+            args.queries,
+        )
+        print(f"{name:14s} p50={p50:.2f}ms p95={p95:.2f}ms")
+
+    client.delete_collection(collection_name=BENCH_COLLECTION)
+
+
+if __name__ == "__main__":
+    main()
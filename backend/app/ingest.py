@@ -1,9 +1,10 @@
 
 from __future__ import annotations
+import time
 from pathlib import Path
 from typing import List
 from .llm import embed
-from .vectorstore import upsert_embeddings
+from .vectorstore import upsert_embeddings, source_fields
 import PyPDF2, docx, pptx
 
 def extract_text(path: str) -> str:
@@ -40,6 +41,8 @@ def ingest_file(path: str, owner: str = "unknown", source_id: str | None = None)
     raw = extract_text(path)
     chunks = chunk(raw)
     vecs = embed(chunks)
-    metas = [ {"owner": owner, "source": path, "chunk": i, "text": t} for i, t in enumerate(chunks) ]
+    # created_at is the ingest time, so a re-ingest resets it
+    base = {"owner": owner, "source": path, **source_fields(path), "created_at": time.time()}
+    metas = [ {**base, "chunk": i, "text": t} for i, t in enumerate(chunks) ]
     upsert_embeddings(vecs, metas)
     return len(chunks)
@@ -1,28 +1,43 @@
 # backend/app/llm.py
 import os, requests, math, hashlib, re
-from typing import List
+from typing import Dict, List, Tuple, Union
+
+SparseEmbedding = Dict[str, list]  # {"indices": [int, ...], "values": [float, ...]}
+Embedding = Union[List[float], SparseEmbedding]
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "").strip()
 OPENAI_API_BASE = os.getenv("OPENAI_API_BASE", "https://api.openai.com/v1").strip()
 EMBED_MODEL = os.getenv("EMBED_MODEL", "text-embedding-3-small").strip()  # 1536 dims
 CHAT_MODEL = os.getenv("CHAT_MODEL", "gpt-4o-mini").strip()
 FALLBACK_DIM = int(os.getenv("FALLBACK_EMBED_DIM", "1536"))
+# Emit the hashing fallback as {"indices", "values"} sparse vectors instead of dense lists
+FALLBACK_SPARSE = os.getenv("FALLBACK_EMBED_SPARSE", "").strip().lower() in ("1", "true", "yes")
 
 def _use_openai() -> bool:
     return bool(OPENAI_API_KEY)
 
 # ---------------- Embeddings ----------------
 
-def _hash_embed(text: str, dim: int = FALLBACK_DIM) -> List[float]:
-    vec = [0.0] * dim
+def _hash_embed_sparse(text: str, dim: int = FALLBACK_DIM) -> SparseEmbedding:
+    counts: Dict[int, float] = {}
     tokens = re.findall(r"[\w\-']+", text.lower())
     for t in tokens:
         h = int(hashlib.sha256(t.encode("utf-8")).hexdigest(), 16)
-        vec[h % dim] += 1.0
-    s = math.sqrt(sum(v*v for v in vec)) or 1.0
-    return [v/s for v in vec]
+        counts[h % dim] = counts.get(h % dim, 0.0) + 1.0
+    s = math.sqrt(sum(v*v for v in counts.values())) or 1.0
+    indices = sorted(counts)
+    return {"indices": indices, "values": [counts[i]/s for i in indices]}
+
+def _hash_embed(text: str, dim: int = FALLBACK_DIM) -> List[float]:
+    sv = _hash_embed_sparse(text, dim)
+    vec = [0.0] * dim
+    for i, v in zip(sv["indices"], sv["values"]):
+        vec[i] = v
+    return vec
 
-def embed(texts: List[str]) -> List[List[float]]:
+def embed_with_status(texts: List[str]) -> Tuple[List[Embedding], bool]:
+    """Embed texts; the flag is True when the OpenAI call failed and the hashing fallback was used."""
+    failed = False
     if _use_openai():
         try:
             url = f"{OPENAI_API_BASE}/embeddings"
@@ -31,10 +46,15 @@ def embed(texts: List[str]) -> List[List[float]]:
             r = requests.post(url, json=body, headers=headers, timeout=60)
             r.raise_for_status()
             data = r.json()
-            return [d["embedding"] for d in data["data"]]
+            return [d["embedding"] for d in data["data"]], False
         except Exception:
-            pass
-    return [_hash_embed(t) for t in texts]
+            failed = True
+    if FALLBACK_SPARSE:
+        return [_hash_embed_sparse(t) for t in texts], failed
+    return [_hash_embed(t) for t in texts], failed
+
+def embed(texts: List[str]) -> List[Embedding]:
+    return embed_with_status(texts)[0]
 
 # ---------------- Chat ----------------
 
@@ -2,6 +2,7 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from .routes import documents, chat
+from .batching import query_batcher
 
 app = FastAPI(title="AI Knowledge Hub")
 
@@ -20,3 +21,7 @@ app.include_router(chat.router)
 @app.get("/health")
 def health():
     return {"ok": True}
+
+@app.get("/metrics/embed-batching")
+def embed_batching_metrics():
+    return query_batcher.stats()
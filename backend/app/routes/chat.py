@@ -3,13 +3,15 @@ from __future__ import annotations
 import os
 import re
 import unicodedata
+from datetime import datetime, timezone
 from typing import List, Tuple, Dict, Any, Optional
 
 import requests
 from fastapi import APIRouter, Depends
 from ..auth import get_current_user
 from ..schemas import ChatRequest, ChatResponse, Citation
-from ..llm import embed, chat
+from ..llm import Embedding, chat
+from ..batching import embed_query
 from .. import vectorstore as vs
 
 print("CHAT ROUTE VERSION = v9-no-weather-better-calc")
@@ -32,9 +34,27 @@ WEB_SYSTEM = (
     "Odpověz věcně v jazyce dotazu a drž se faktů."
 )
 
-def _vector_search(qvec: List[float], top_k: int) -> List[Tuple[Dict[str, Any], float]]:
+def _timestamp(dt: Optional[datetime]) -> Optional[float]:
+    # naive datetimes are taken as UTC, not the server's local time
+    if dt is None:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+def _search_filters(payload: ChatRequest, user: Dict[str, Any]) -> Dict[str, Any]:
+    """Retrieval filters for the request, always scoped to the caller."""
+    return {
+        "owner": str(user.get("sub", "unknown")),
+        "source": payload.source,
+        "file_type": payload.file_type,
+        "created_after": _timestamp(payload.created_after),
+        "created_before": _timestamp(payload.created_before),
+    }
+
+def _vector_search(qvec: Embedding, top_k: int, filters: Dict[str, Any]) -> List[Tuple[Dict[str, Any], float]]:
     try:
-        return vs.search(qvec, top_k=top_k)
+        return vs.search(qvec, top_k=top_k, **filters)
     except Exception:
         return []
 
@@ -177,8 +197,8 @@ def _web_answer(query: str) -> ChatResponse:
 BASE_EMAIL_RE = re.compile(r"[A-Za-z0-9._%+\-]+@[A-Za-z0-9.\-]+\.[A-Za-z]{2,}", re.I)
 PHONE_RE = re.compile(r"(?:(?:\+?\s?(?:420|421)|\+?\s?\d{1,3})\s*)?(?:\d\s*){9,}", re.I)
 
-def _contact_answer(query: str, qvec: List[float]) -> Optional[ChatResponse]:
-    hits = _vector_search(qvec, top_k=200)
+def _contact_answer(query: str, qvec: Embedding, filters: Dict[str, Any]) -> Optional[ChatResponse]:
+    hits = _vector_search(qvec, top_k=200, filters=filters)
     # ... (tvoje současná logika pro hledání emailů/telefonů) ...
     return None
 
@@ -194,12 +214,13 @@ def ask(payload: ChatRequest, user=Depends(get_current_user)):
     if intent == "WEB":
         return _web_answer(query)
 
-    qvec = embed([query])[0]
+    qvec = embed_query(query)
+    filters = _search_filters(payload, user)
     if intent == "CONTACT":
-        resp = _contact_answer(query, qvec)
+        resp = _contact_answer(query, qvec, filters)
         if resp: return resp
 
-    hits = _vector_search(qvec, top_k=max(8, payload.top_k))
+    hits = _vector_search(qvec, top_k=max(8, payload.top_k), filters=filters)
     has_context = False
     context_parts: List[str] = []
     citations: List[Citation] = []
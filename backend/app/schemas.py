@@ -1,5 +1,6 @@
 # backend/app/schemas.py
 from pydantic import BaseModel
+from datetime import datetime
 from typing import List, Optional
 
 class FileMeta(BaseModel):
@@ -22,6 +23,11 @@ class ListResponse(BaseModel):
 class ChatRequest(BaseModel):
     query: str
     top_k: int = 5
+    # Optional retrieval filters; the owner is always taken from the caller.
+    source: Optional[str] = None
+    file_type: Optional[str] = None
+    created_after: Optional[datetime] = None
+    created_before: Optional[datetime] = None
 
 class Citation(BaseModel):
     source: str
@@ -0,0 +1,444 @@
+# backend/app/snapshot.py
+"""Binary snapshot export/import of the vector collections.
+
+Restores a collection without re-running extraction and embedding:
+
+    python -m app.snapshot export backup.nvs [--sparse]
+    python -m app.snapshot import backup.nvs [--parallel 4 --batch-size 1024]
+
+File layout (little-endian):
+
+    b"NVSNAP1\\0" | u32 header_len | header JSON
+    chunk*      | b"END\\0" | u64 point_count
+
+    dense chunk:  b"DENS" | u32 n | u32 dim | u32 meta_len | zlib(JSON ids+payloads)
+                  | zero padding to 64 bytes | float32[n * dim]
+    sparse chunk: b"SPRS" | u32 n | u32 nnz | u32 meta_len | zlib(JSON ids+payloads)
+                  | zero padding to 64 bytes | u32 indptr[n + 1] | u32 indices[nnz] | float32 values[nnz]
+
+Dense vector blocks are raw and aligned, so `open_snapshot` can memory map
+them straight into a numpy-backed local index. A file without the END trailer,
+or whose chunks do not add up to `point_count`, is rejected as truncated.
+"""
+import argparse
+import json
+import os
+import struct
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, Iterator, List, Optional, Tuple
+
+import numpy as np
+from qdrant_client.http.models import (
+    Distance,
+    VectorParams,
+    PointStruct,
+    SparseVector,
+    SparseVectorParams,
+    SparseIndexParams,
+    OptimizersConfigDiff,
+)
+
+from . import vectorstore as vs
+
+MAGIC = b"NVSNAP1\0"
+END = b"END\0"
+DENSE = b"DENS"
+SPARSE = b"SPRS"
+ALIGN = 64
+INDEXING_THRESHOLD = 20000  # Qdrant default, restored after a bulk load
+
+_U32 = struct.Struct("<I")
+_U64 = struct.Struct("<Q")
+_CHUNK = struct.Struct("<4sIII")
+
+
+def _pad(pos: int) -> int:
+    return (-pos) % ALIGN
+
+
+def _write_header(f: BinaryIO, header: dict) -> None:
+    raw = json.dumps(header).encode("utf-8")
+    f.write(MAGIC)
+    f.write(_U32.pack(len(raw)))
+    f.write(raw)
+
+
+def _read_exact(f: BinaryIO, n: int) -> bytes:
+    data = f.read(n)
+    if len(data) != n:
+        raise ValueError("Snapshot file is truncated")
+    return data
+
+
+def _read_header(f: BinaryIO) -> dict:
+    if f.read(len(MAGIC)) != MAGIC:
+        raise ValueError("Not a vector snapshot file")
+    (n,) = _U32.unpack(_read_exact(f, _U32.size))
+    return json.loads(_read_exact(f, n).decode("utf-8"))
+
+
+def _write_chunk(f: BinaryIO, kind: bytes, n: int, width: int, meta: dict, blocks: List[np.ndarray]) -> None:
+    packed = zlib.compress(json.dumps(meta, ensure_ascii=False).encode("utf-8"))
+    f.write(_CHUNK.pack(kind, n, width, len(packed)))
+    f.write(packed)
+    f.write(b"\0" * _pad(f.tell()))
+    for b in blocks:
+        f.write(b.tobytes())
+
+
+def _write_trailer(f: BinaryIO, total: int) -> None:
+    f.write(END)
+    f.write(_U64.pack(total))
+
+
+# ---------------- Export ----------------
+
+def _scroll(client, collection: str, batch_size: int):
+    offset = None
+    while True:
+        records, offset = client.scroll(
+            collection_name=collection,
+            limit=batch_size,
+            offset=offset,
+            with_payload=True,
+            with_vectors=True,
+        )
+        if records:
+            yield records
+        if offset is None:
+            break
+
+
+def export_snapshot(path: str, sparse: bool = False, batch_size: int = 2048) -> int:
+    client = vs.get_client()
+    collection = vs.SPARSE_COLLECTION if sparse else vs.COLLECTION
+    info = client.get_collection(collection_name=collection)
+    header = {"collection": collection, "sparse": sparse}
+    if not sparse:
+        params = info.config.params.vectors
+        header["dim"] = params.size
+        header["distance"] = Distance(params.distance).value
+
+    # Written under a temporary name so a failed export never leaves a file
+    # that looks like a complete snapshot.
+    tmp = path + ".tmp"
+    try:
+        total = _export_to(tmp, client, collection, header, sparse, batch_size)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    return total
+
+
+def _export_to(path: str, client, collection: str, header: dict, sparse: bool, batch_size: int) -> int:
+    total = 0
+    with open(path, "wb") as f:
+        _write_header(f, header)
+        for records in _scroll(client, collection, batch_size):
+            meta = {"ids": [r.id for r in records], "payloads": [r.payload for r in records]}
+            n = len(records)
+            if sparse:
+                vecs = [(r.vector or {}).get(vs.SPARSE_VECTOR) for r in records]
+                indptr = np.zeros(n + 1, dtype="<u4")
+                indptr[1:] = np.cumsum([len(v.indices) if v else 0 for v in vecs])
+                indices = np.array([i for v in vecs if v for i in v.indices], dtype="<u4")
+                values = np.array([x for v in vecs if v for x in v.values], dtype="<f4")
+                _write_chunk(f, SPARSE, n, int(indptr[-1]), meta, [indptr, indices, values])
+            else:
+                block = np.asarray([r.vector for r in records], dtype="<f4")
+                _write_chunk(f, DENSE, n, header["dim"], meta, [block])
+            total += n
+        _write_trailer(f, total)
+    return total
+
+
+# ---------------- Reading ----------------
+
+def _iter_chunks(f: BinaryIO) -> Iterator[Tuple[bytes, int, int, dict, int]]:
+    """Yield (kind, n, width, meta, data_offset) and skip past each data block.
+
+    Raises ValueError if the file ends before the END trailer or the trailer's
+    point count does not match the chunks.
+    """
+    seen = 0
+    while True:
+        tag = _read_exact(f, 4)
+        if tag == END:
+            (expected,) = _U64.unpack(_read_exact(f, _U64.size))
+            if expected != seen:
+                raise ValueError(f"Snapshot holds {seen} points, trailer says {expected}")
+            return
+        kind, n, width, meta_len = _CHUNK.unpack(tag + _read_exact(f, _CHUNK.size - 4))
+        if kind == DENSE:
+            size = n * width * 4
+        elif kind == SPARSE:
+            size = (n + 1) * 4 + width * 8
+        else:
+            raise ValueError(f"Unknown snapshot chunk {kind!r}")
+        meta = json.loads(zlib.decompress(_read_exact(f, meta_len)).decode("utf-8"))
+        f.seek(_pad(f.tell()), 1)
+        offset = f.tell()
+        # seeking past EOF does not fail, so check the data block really is there
+        f.seek(size, 1)
+        if f.tell() > os.fstat(f.fileno()).st_size:
+            raise ValueError("Snapshot file is truncated")
+        seen += n
+        yield kind, n, width, meta, offset
+
+
+def _count_points(path: str) -> int:
+    """Walk the chunk headers, validating the file, and return its point count."""
+    with open(path, "rb") as f:
+        _read_header(f)
+        return sum(n for _, n, _, _, _ in _iter_chunks(f))
+
+
+def _read_points(path: str) -> Iterator[List[PointStruct]]:
+    with open(path, "rb") as f:
+        _read_header(f)
+        for kind, n, width, meta, offset in _iter_chunks(f):
+            f.seek(offset)
+            if kind == DENSE:
+                block = np.frombuffer(f.read(n * width * 4), dtype="<f4").reshape(n, width)
+                vectors = [row.tolist() for row in block]
+            else:
+                indptr = np.frombuffer(f.read((n + 1) * 4), dtype="<u4")
+                indices = np.frombuffer(f.read(width * 4), dtype="<u4")
+                values = np.frombuffer(f.read(width * 4), dtype="<f4")
+                vectors = [
+                    {vs.SPARSE_VECTOR: SparseVector(
+                        indices=indices[indptr[i]:indptr[i + 1]].tolist(),
+                        values=values[indptr[i]:indptr[i + 1]].tolist(),
+                    )}
+                    for i in range(n)
+                ]
+            yield [
+                PointStruct(id=pid, vector=v, payload=p)
+                for pid, v, p in zip(meta["ids"], vectors, meta["payloads"])
+            ]
+
+
+# ---------------- Import ----------------
+
+def _config_mismatch(client, header: dict) -> Optional[str]:
+    params = client.get_collection(collection_name=header["collection"]).config.params
+    dense = params.vectors if isinstance(params.vectors, VectorParams) else None
+    if header.get("sparse"):
+        if dense is not None or vs.SPARSE_VECTOR not in (params.sparse_vectors or {}):
+            return f"expected a sparse collection with vector {vs.SPARSE_VECTOR!r}"
+        return None
+    if dense is None:
+        return "expected a dense collection with a single unnamed vector"
+    distance = Distance(header.get("distance", "Cosine"))
+    if dense.size != header["dim"] or Distance(dense.distance) != distance:
+        return f"snapshot has dim={header['dim']} {distance.value}, collection has dim={dense.size} {Distance(dense.distance).value}"
+    return None
+
+
+def _create_for_bulk_load(client, header: dict) -> bool:
+    """Create the target collection in bulk-load mode; False if loading into an existing one.
+
+    An existing empty collection (e.g. auto-created by a search after volume
+    loss) is dropped and recreated. A non-empty one must match the snapshot's
+    vector config.
+    """
+    collection = header["collection"]
+    existing = [c.name for c in client.get_collections().collections]
+    if collection in existing:
+        if client.count(collection_name=collection, exact=True).count:
+            problem = _config_mismatch(client, header)
+            if problem:
+                raise ValueError(f"Collection {collection!r} does not match the snapshot: {problem}")
+            return False
+        client.delete_collection(collection_name=collection)
+        vs._indexed_collections.discard(collection)
+    # Indexing is switched off while loading and rebuilt once at the end.
+    optimizers = OptimizersConfigDiff(indexing_threshold=0)
+    if header.get("sparse"):
+        client.create_collection(
+            collection_name=collection,
+            vectors_config={},
+            sparse_vectors_config={vs.SPARSE_VECTOR: SparseVectorParams(index=SparseIndexParams(on_disk=False))},
+            optimizers_config=optimizers,
+        )
+    else:
+        client.create_collection(
+            collection_name=collection,
+            vectors_config=VectorParams(size=header["dim"], distance=Distance(header.get("distance", "Cosine"))),
+            optimizers_config=optimizers,
+        )
+    vs.ensure_payload_indexes(client, collection)
+    return True
+
+
+def import_snapshot(path: str, batch_size: int = 1024, parallel: int = 4) -> int:
+    client = vs.get_client()
+    with open(path, "rb") as f:
+        header = _read_header(f)
+    # Validate the whole file before touching Qdrant, so a truncated
+    # snapshot never half-loads.
+    expected = _count_points(path)
+    collection = header["collection"]
+    created = _create_for_bulk_load(client, header)
+
+    def _upsert(points: List[PointStruct]) -> int:
+        client.upsert(collection_name=collection, points=points, wait=False)
+        return len(points)
+
+    def _batches() -> Iterator[List[PointStruct]]:
+        for points in _read_points(path):
+            for i in range(0, len(points), batch_size):
+                yield points[i:i + batch_size]
+
+    # Keep only a few batches in flight so the file is streamed, not loaded whole.
+    workers = max(1, parallel)
+    total = 0
+    last: List[PointStruct] = []
+    pending: deque = deque()
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for batch in _batches():
+                last = batch
+                pending.append(pool.submit(_upsert, batch))
+                if len(pending) >= workers * 2:
+                    total += pending.popleft().result()
+            while pending:
+                total += pending.popleft().result()
+        # Updates are applied in order; re-sending the last batch with wait=True
+        # returns only once everything before it has been applied too.
+        if last:
+            client.upsert(collection_name=collection, points=last, wait=True)
+        if total != expected:
+            raise ValueError(f"Loaded {total} of {expected} snapshot points")
+    finally:
+        if created:
+            client.update_collection(
+                collection_name=collection,
+                optimizers_config=OptimizersConfigDiff(indexing_threshold=INDEXING_THRESHOLD),
+            )
+    return total
+
+
+# ---------------- Local memory-mapped index ----------------
+
+class SnapshotIndex:
+    """Read-only dense index over the memory-mapped vector blocks of a snapshot.
+
+    Vector norms and the filterable payload fields are held in memory; the
+    vectors themselves are only read from the map during search.
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            header = _read_header(f)
+            if header.get("sparse"):
+                raise ValueError("Only dense snapshots can be memory mapped")
+            chunks = list(_iter_chunks(f))
+        self.header = header
+        self.blocks: List[np.memmap] = []
+        self.payloads: List[dict] = []
+        norms = []
+        for _, n, dim, meta, offset in chunks:
+            if n:
+                block = np.memmap(path, dtype="<f4", mode="r", offset=offset, shape=(n, dim))
+                self.blocks.append(block)
+                norms.append(np.linalg.norm(block, axis=1))
+                self.payloads.extend(meta["payloads"])
+        self.norms = np.concatenate(norms) if norms else np.zeros(0, dtype=np.float32)
+        self.norms[self.norms == 0] = 1.0
+
+        def _field(key):
+            return np.array([(p or {}).get(key) for p in self.payloads], dtype=object)
+
+        self._owner = _field("owner")
+        self._filename = _field("filename")
+        self._file_type = _field("file_type")
+        self._created_at = np.array(
+            [(p or {}).get("created_at", np.nan) for p in self.payloads], dtype=np.float64
+        )
+
+    def __len__(self) -> int:
+        return len(self.payloads)
+
+    def _mask(
+        self,
+        owner: Optional[str],
+        source: Optional[str],
+        file_type: Optional[str],
+        created_after: Optional[float],
+        created_before: Optional[float],
+    ) -> Optional[np.ndarray]:
+        """Same semantics as vectorstore.build_filter, evaluated over the payloads."""
+        mask = None
+
+        def _and(m):
+            return m if mask is None else mask & m
+
+        if owner:
+            mask = _and(self._owner == owner)
+        if source:
+            mask = _and(self._filename == source)
+        if file_type:
+            mask = _and(self._file_type == file_type.lower().lstrip("."))
+        if created_after is not None:
+            mask = _and(self._created_at >= created_after)
+        if created_before is not None:
+            mask = _and(self._created_at <= created_before)
+        return mask
+
+    def search(
+        self,
+        query_vec: List[float],
+        top_k: int = 5,
+        owner: Optional[str] = None,
+        source: Optional[str] = None,
+        file_type: Optional[str] = None,
+        created_after: Optional[float] = None,
+        created_before: Optional[float] = None,
+    ) -> List[Tuple[dict, float]]:
+        if not self.blocks or top_k <= 0:
+            return []
+        q = np.asarray(query_vec, dtype=np.float32)
+        q = q / (np.linalg.norm(q) or 1.0)
+        scores = np.concatenate([block @ q for block in self.blocks]) / self.norms
+        mask = self._mask(owner, source, file_type, created_after, created_before)
+        candidates = np.flatnonzero(mask) if mask is not None else np.arange(len(scores))
+        if not len(candidates):
+            return []
+        k = min(top_k, len(candidates))
+        top = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        top = top[np.argsort(-scores[top])]
+        return [(self.payloads[i], float(scores[i])) for i in top]
+
+
+def open_snapshot(path: str) -> SnapshotIndex:
+    return SnapshotIndex(path)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(prog="python -m app.snapshot")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    ex = sub.add_parser("export")
+    ex.add_argument("path")
+    ex.add_argument("--sparse", action="store_true", help="export the sparse fallback collection")
+    ex.add_argument("--batch-size", type=int, default=2048)
+    im = sub.add_parser("import")
+    im.add_argument("path")
+    im.add_argument("--batch-size", type=int, default=1024)
+    im.add_argument("--parallel", type=int, default=4)
+    args = ap.parse_args(argv)
+
+    if args.cmd == "export":
+        n = export_snapshot(args.path, sparse=args.sparse, batch_size=args.batch_size)
+        print(f"exported {n} points to {args.path}")
+    else:
+        n = import_snapshot(args.path, batch_size=args.batch_size, parallel=args.parallel)
+        print(f"imported {n} points from {args.path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+import threading
+import time
+
+import pytest
+
+from app import llm
+from app.batching import EmbedBatcher
+
+
+def _ok(fn):
+    return lambda texts: (fn(texts), False)
+
+
+def _run_concurrently(batcher, texts):
+    out = [None] * len(texts)
+    errors = [None] * len(texts)
+
+    def call(i):
+        try:
+            out[i] = batcher.embed(texts[i])
+        except Exception as e:
+            errors[i] = e
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(len(texts))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(timeout=5)
+    return out, errors
+
+
+def test_results_map_back_to_callers():
+    batcher = EmbedBatcher(_ok(lambda texts: [[len(t), t.count("x")] for t in texts]), max_wait_ms=20, max_batch=8)
+    texts = ["x" * i + "y" * (i % 3) for i in range(30)]
+    out, errors = _run_concurrently(batcher, texts)
+    assert errors == [None] * 30
+    assert out == [[len(t), t.count("x")] for t in texts]
+
+
+def test_batches_capped_at_max_batch():
+    sizes = []
+    release = threading.Event()
+
+    def embed(texts):
+        sizes.append(len(texts))
+        release.wait(1)
+        return texts
+
+    batcher = EmbedBatcher(_ok(embed), max_wait_ms=200, max_batch=4, concurrency=8)
+    threading.Timer(0.3, release.set).start()
+    out, _ = _run_concurrently(batcher, [str(i) for i in range(10)])
+    assert out == [str(i) for i in range(10)]
+    assert max(sizes) == 4
+    assert sum(sizes) == 10
+    assert batcher.stats()["batch_size"]["max"] == 4
+
+
+def test_single_request_sent_after_wait_deadline():
+    batcher = EmbedBatcher(_ok(lambda texts: texts), max_wait_ms=50, max_batch=64)
+    t0 = time.perf_counter()
+    assert batcher.embed("a") == "a"
+    elapsed_ms = (time.perf_counter() - t0) * 1000
+    assert 40 <= elapsed_ms < 1000
+    stats = batcher.stats()
+    assert stats["batches"] == 1
+    assert stats["queue_wait_ms"]["max"] >= 40
+
+
+def test_exception_propagates_and_is_counted():
+    def embed(texts):
+        raise RuntimeError("rate limited")
+
+    batcher = EmbedBatcher(_ok(embed), max_wait_ms=10, max_batch=4)
+    with pytest.raises(RuntimeError, match="rate limited"):
+        batcher.embed("a")
+    stats = batcher.stats()
+    assert stats["failed_batches"] == 1
+    assert stats["batches"] == 1
+    assert stats["requests"] == 1
+    assert stats["batch_size"]["max"] == 1
+
+
+def test_wrong_vector_count_fails_batch():
+    batcher = EmbedBatcher(_ok(lambda texts: []), max_wait_ms=1, max_batch=4)
+    with pytest.raises(RuntimeError, match="0 vectors for 1 texts"):
+        batcher.embed("a")
+
+
+def test_batches_overlap_while_calls_in_flight():
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def embed(texts):
+        nonlocal active, peak
+        with lock:
+            active += 1
+            peak = max(peak, active)
+        time.sleep(0.05)
+        with lock:
+            active -= 1
+        return texts
+
+    batcher = EmbedBatcher(_ok(embed), max_wait_ms=1, max_batch=2, concurrency=4)
+    out, _ = _run_concurrently(batcher, [str(i) for i in range(16)])
+    assert out == [str(i) for i in range(16)]
+    assert peak > 1
+    assert peak <= 4
+
+
+def test_provider_fallback_is_counted(monkeypatch):
+    def failing_post(*args, **kwargs):
+        raise RuntimeError("429 Too Many Requests")
+
+    monkeypatch.setattr(llm, "OPENAI_API_KEY", "sk-test")
+    monkeypatch.setattr(llm.requests, "post", failing_post)
+    batcher = EmbedBatcher(llm.embed_with_status, max_wait_ms=1, max_batch=4)
+    assert batcher.embed("hello") == llm._hash_embed("hello")
+    stats = batcher.stats()
+    assert stats["provider_fallbacks"] == 1
+    assert stats["failed_batches"] == 0
@@ -0,0 +1,40 @@
+from datetime import datetime, timezone
+
+from app.routes import chat as chat_route
+from app.schemas import ChatRequest
+
+
+def test_search_filters_always_scope_to_caller():
+    filters = chat_route._search_filters(ChatRequest(query="q"), {"sub": "alice"})
+    assert filters == {
+        "owner": "alice",
+        "source": None,
+        "file_type": None,
+        "created_after": None,
+        "created_before": None,
+    }
+
+
+def test_search_filters_naive_dates_are_utc():
+    payload = ChatRequest(
+        query="q",
+        source="report.pdf",
+        file_type="pdf",
+        created_after="2024-01-01T00:00:00",
+        created_before="2024-01-02T01:00:00+01:00",
+    )
+    filters = chat_route._search_filters(payload, {"sub": "bob"})
+    assert filters["owner"] == "bob"
+    assert filters["source"] == "report.pdf"
+    assert filters["created_after"] == datetime(2024, 1, 1, tzinfo=timezone.utc).timestamp()
+    assert filters["created_before"] == datetime(2024, 1, 2, tzinfo=timezone.utc).timestamp()
+
+
+def test_ask_passes_caller_owner_to_search(monkeypatch):
+    calls = []
+    monkeypatch.setattr(chat_route, "embed_query", lambda q: [1.0, 0.0])
+    monkeypatch.setattr(chat_route.vs, "search", lambda qvec, top_k, **kw: calls.append(kw) or [])
+    monkeypatch.setattr(chat_route, "chat", lambda system, user: "ok")
+
+    chat_route.ask(ChatRequest(query="summary of my notes"), user={"sub": "carol"})
+    assert calls and all(c["owner"] == "carol" for c in calls)
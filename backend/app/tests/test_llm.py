@@ -0,0 +1,38 @@
+from app import llm
+
+
+def test_sparse_hash_embed_matches_dense():
+    text = "Quarterly report: revenue grew, revenue-share grew again"
+    dense = llm._hash_embed(text, dim=64)
+    sparse = llm._hash_embed_sparse(text, dim=64)
+    assert sparse["indices"] == sorted(sparse["indices"])
+    assert sparse["indices"] == [i for i, v in enumerate(dense) if v]
+    assert sparse["values"] == [dense[i] for i in sparse["indices"]]
+
+
+def test_sparse_hash_embed_empty_text():
+    assert llm._hash_embed_sparse("", dim=64) == {"indices": [], "values": []}
+    assert llm._hash_embed("", dim=64) == [0.0] * 64
+
+
+def test_embed_fallback_modes(monkeypatch):
+    monkeypatch.setattr(llm, "OPENAI_API_KEY", "")
+    monkeypatch.setattr(llm, "FALLBACK_SPARSE", True)
+    assert llm.embed(["hello world"]) == [llm._hash_embed_sparse("hello world")]
+    monkeypatch.setattr(llm, "FALLBACK_SPARSE", False)
+    assert llm.embed(["hello world"]) == [llm._hash_embed("hello world")]
+
+
+def test_embed_with_status_flags_only_provider_failures(monkeypatch):
+    monkeypatch.setattr(llm, "FALLBACK_SPARSE", False)
+    monkeypatch.setattr(llm, "OPENAI_API_KEY", "")
+    assert llm.embed_with_status(["a"])[1] is False
+
+    def failing_post(*args, **kwargs):
+        raise RuntimeError("timeout")
+
+    monkeypatch.setattr(llm, "OPENAI_API_KEY", "sk-test")
+    monkeypatch.setattr(llm.requests, "post", failing_post)
+    vecs, fell_back = llm.embed_with_status(["a"])
+    assert fell_back is True
+    assert vecs == [llm._hash_embed("a")]
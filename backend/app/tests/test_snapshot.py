@@ -0,0 +1,241 @@
+import numpy as np
+import pytest
+
+from app import snapshot
+from app import vectorstore as vs
+
+
+def _write_dense(path, vectors, payloads, chunk=2):
+    dim = len(vectors[0])
+    with open(path, "wb") as f:
+        snapshot._write_header(f, {"collection": vs.COLLECTION, "sparse": False, "dim": dim, "distance": "Cosine"})
+        for i in range(0, len(vectors), chunk):
+            vecs, pays = vectors[i:i + chunk], payloads[i:i + chunk]
+            meta = {"ids": list(range(i, i + len(vecs))), "payloads": pays}
+            block = np.asarray(vecs, dtype="<f4")
+            snapshot._write_chunk(f, snapshot.DENSE, len(vecs), dim, meta, [block])
+            # chunk data must start on an aligned offset for memory mapping
+            assert (f.tell() - block.nbytes) % snapshot.ALIGN == 0
+        snapshot._write_trailer(f, len(vectors))
+
+
+DENSE_VECTORS = [
+    [1.0, 0.0, 0.0],
+    [0.0, 2.0, 0.0],
+    [3.0, 3.0, 0.0],
+    [0.0, 0.0, 0.0],
+    [0.5, 0.0, 0.1],
+]
+DENSE_PAYLOADS = [
+    {"owner": "a", "filename": "x.pdf", "file_type": "pdf", "created_at": 10.0, "text": "east"},
+    {"owner": "a", "filename": "y.md", "file_type": "md", "created_at": 20.0, "text": "north"},
+    {"owner": "b", "filename": "z.pdf", "file_type": "pdf", "created_at": 30.0, "text": "north-east"},
+    {"owner": "b", "text": "empty"},
+    {"owner": "b", "filename": "x.pdf", "file_type": "pdf", "created_at": 40.0, "text": "mostly east"},
+]
+
+
+def test_dense_round_trip(tmp_path):
+    path = tmp_path / "dense.nvs"
+    _write_dense(path, DENSE_VECTORS, DENSE_PAYLOADS)
+
+    points = [p for batch in snapshot._read_points(str(path)) for p in batch]
+    assert [p.id for p in points] == [0, 1, 2, 3, 4]
+    assert [p.payload for p in points] == DENSE_PAYLOADS
+    assert np.allclose([p.vector for p in points], DENSE_VECTORS)
+
+
+def test_sparse_round_trip(tmp_path):
+    path = tmp_path / "sparse.nvs"
+    rows = [([1, 7], [0.6, 0.8]), ([], []), ([3], [1.0])]
+    indptr = np.array([0, 2, 2, 3], dtype="<u4")
+    indices = np.array([1, 7, 3], dtype="<u4")
+    values = np.array([0.6, 0.8, 1.0], dtype="<f4")
+    payloads = [{"text": "a"}, {"text": "b"}, {"text": "c"}]
+    with open(path, "wb") as f:
+        snapshot._write_header(f, {"collection": vs.SPARSE_COLLECTION, "sparse": True})
+        snapshot._write_chunk(f, snapshot.SPARSE, 3, 3, {"ids": ["p1", "p2", "p3"], "payloads": payloads},
+                              [indptr, indices, values])
+        # a second chunk proves the first one's size (indptr + nnz * 8) is skipped exactly
+        snapshot._write_chunk(f, snapshot.SPARSE, 1, 1, {"ids": ["p4"], "payloads": [{"text": "d"}]},
+                              [np.array([0, 1], dtype="<u4"), np.array([9], dtype="<u4"),
+                               np.array([1.0], dtype="<f4")])
+        snapshot._write_trailer(f, 4)
+
+    batches = list(snapshot._read_points(str(path)))
+    assert [len(b) for b in batches] == [3, 1]
+    points = [p for b in batches for p in b]
+    assert [p.id for p in points] == ["p1", "p2", "p3", "p4"]
+    for p, (idx, vals) in zip(points, rows):
+        sv = p.vector[vs.SPARSE_VECTOR]
+        assert sv.indices == idx
+        assert np.allclose(sv.values, vals)
+    assert points[3].vector[vs.SPARSE_VECTOR].indices == [9]
+
+
+def test_rejects_foreign_file(tmp_path):
+    path = tmp_path / "bad.nvs"
+    path.write_bytes(b"not a snapshot")
+    with pytest.raises(ValueError):
+        list(snapshot._read_points(str(path)))
+
+
+def test_snapshot_index_ranking_and_filters(tmp_path):
+    path = tmp_path / "dense.nvs"
+    _write_dense(path, DENSE_VECTORS, DENSE_PAYLOADS)
+    index = snapshot.open_snapshot(str(path))
+    assert len(index) == 5
+
+    hits = index.search([1.0, 0.0, 0.0], top_k=3)
+    assert [m["text"] for m, _ in hits] == ["east", "mostly east", "north-east"]
+    assert hits[0][1] == pytest.approx(1.0)
+
+    def texts(**kw):
+        return [m["text"] for m, _ in index.search([1.0, 0.0, 0.0], top_k=5, **kw)]
+
+    assert texts(owner="a") == ["east", "north"]
+    assert texts(source="x.pdf") == ["east", "mostly east"]
+    assert texts(file_type=".PDF", owner="b") == ["mostly east", "north-east"]
+    assert texts(created_after=20.0, created_before=30.0) == ["north-east", "north"]
+    assert texts(owner="nobody") == []
+
+
+class _FailingClient:
+    def __init__(self):
+        self.optimizer_updates = []
+
+    def get_collections(self):
+        return type("R", (), {"collections": []})()
+
+    def create_collection(self, **kwargs):
+        pass
+
+    def create_payload_index(self, **kwargs):
+        pass
+
+    def upsert(self, **kwargs):
+        raise RuntimeError("qdrant went away")
+
+    def update_collection(self, collection_name, optimizers_config):
+        self.optimizer_updates.append(optimizers_config.indexing_threshold)
+
+
+def test_import_restores_indexing_on_failure(tmp_path, monkeypatch):
+    path = tmp_path / "dense.nvs"
+    _write_dense(path, DENSE_VECTORS, DENSE_PAYLOADS)
+    client = _FailingClient()
+    monkeypatch.setattr(vs, "get_client", lambda: client)
+
+    with pytest.raises(RuntimeError, match="went away"):
+        snapshot.import_snapshot(str(path), batch_size=2, parallel=2)
+    assert client.optimizer_updates == [snapshot.INDEXING_THRESHOLD]
+
+
+def test_export_import_through_qdrant(tmp_path, monkeypatch):
+    from qdrant_client import QdrantClient
+    from qdrant_client.http.models import Distance, PointStruct, VectorParams
+
+    source = QdrantClient(":memory:")
+    source.create_collection(vs.COLLECTION, vectors_config=VectorParams(size=3, distance=Distance.COSINE))
+    source.upsert(vs.COLLECTION, points=[
+        PointStruct(id=i + 1, vector=v, payload=p)
+        for i, (v, p) in enumerate(zip(DENSE_VECTORS[:3], DENSE_PAYLOADS[:3]))
+    ])
+    monkeypatch.setattr(vs, "get_client", lambda: source)
+    path = tmp_path / "export.nvs"
+    assert snapshot.export_snapshot(str(path), batch_size=2) == 3
+
+    target = QdrantClient(":memory:")
+    monkeypatch.setattr(vs, "get_client", lambda: target)
+    assert snapshot.import_snapshot(str(path), batch_size=2, parallel=2) == 3
+    assert target.count(vs.COLLECTION).count == 3
+    restored = {p.id: p.payload for p in target.retrieve(vs.COLLECTION, ids=[1, 2, 3])}
+    assert restored[3]["text"] == "north-east"
+
+
+@pytest.mark.parametrize("cut", ["chunk_boundary", "mid_chunk", "no_trailer_count"])
+def test_truncated_snapshot_is_rejected(tmp_path, cut):
+    full = tmp_path / "full.nvs"
+    _write_dense(full, DENSE_VECTORS, DENSE_PAYLOADS)
+    data = full.read_bytes()
+    with open(full, "rb") as f:
+        snapshot._read_header(f)
+        ends = []
+        for _, n, dim, _, offset in snapshot._iter_chunks(f):
+            ends.append(offset + n * dim * 4)
+    cuts = {"chunk_boundary": ends[0], "mid_chunk": ends[1] - 5, "no_trailer_count": ends[-1] + 4}
+    path = tmp_path / "cut.nvs"
+    path.write_bytes(data[:cuts[cut]])
+
+    with pytest.raises(ValueError, match="truncated"):
+        list(snapshot._read_points(str(path)))
+    with pytest.raises(ValueError, match="truncated"):
+        snapshot.open_snapshot(str(path))
+
+
+def test_trailer_count_mismatch_is_rejected(tmp_path):
+    path = tmp_path / "dense.nvs"
+    _write_dense(path, DENSE_VECTORS, DENSE_PAYLOADS)
+    data = path.read_bytes()
+    path.write_bytes(data[:-8] + snapshot._U64.pack(99))
+    with pytest.raises(ValueError, match="trailer says 99"):
+        snapshot._count_points(str(path))
+
+
+def _dense_client():
+    from qdrant_client import QdrantClient
+    from qdrant_client.http.models import Distance, PointStruct, VectorParams
+
+    client = QdrantClient(":memory:")
+    client.create_collection(vs.COLLECTION, vectors_config=VectorParams(size=3, distance=Distance.COSINE))
+    client.upsert(vs.COLLECTION, points=[
+        PointStruct(id=i + 1, vector=v, payload=p)
+        for i, (v, p) in enumerate(zip(DENSE_VECTORS[:3], DENSE_PAYLOADS[:3]))
+    ])
+    return client
+
+
+def test_failed_export_leaves_no_file(tmp_path, monkeypatch):
+    client = _dense_client()
+
+    def broken_scroll(**kwargs):
+        raise RuntimeError("connection lost")
+
+    monkeypatch.setattr(vs, "get_client", lambda: client)
+    monkeypatch.setattr(client, "scroll", broken_scroll)
+    path = tmp_path / "export.nvs"
+    with pytest.raises(RuntimeError):
+        snapshot.export_snapshot(str(path))
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_import_into_mismatched_collection_fails(tmp_path, monkeypatch):
+    from qdrant_client import QdrantClient
+    from qdrant_client.http.models import Distance, PointStruct, VectorParams
+
+    path = tmp_path / "dense.nvs"
+    _write_dense(path, DENSE_VECTORS, DENSE_PAYLOADS)
+    target = QdrantClient(":memory:")
+    target.create_collection(vs.COLLECTION, vectors_config=VectorParams(size=2, distance=Distance.COSINE))
+    target.upsert(vs.COLLECTION, points=[PointStruct(id=1, vector=[1.0, 0.0], payload={})])
+    monkeypatch.setattr(vs, "get_client", lambda: target)
+
+    with pytest.raises(ValueError, match="dim=3 Cosine, collection has dim=2"):
+        snapshot.import_snapshot(str(path))
+    assert target.count(vs.COLLECTION).count == 1
+
+
+def test_import_replaces_empty_auto_created_collection(tmp_path, monkeypatch):
+    from qdrant_client import QdrantClient
+    from qdrant_client.http.models import Distance, VectorParams
+
+    path = tmp_path / "dense.nvs"
+    _write_dense(path, DENSE_VECTORS, DENSE_PAYLOADS)
+    target = QdrantClient(":memory:")
+    # what a /chat search creates after a volume loss, with a different dim
+    target.create_collection(vs.COLLECTION, vectors_config=VectorParams(size=1536, distance=Distance.COSINE))
+    monkeypatch.setattr(vs, "get_client", lambda: target)
+
+    assert snapshot.import_snapshot(str(path), batch_size=2) == 5
+    assert target.get_collection(vs.COLLECTION).config.params.vectors.size == 3
+    assert target.count(vs.COLLECTION).count == 5
@@ -0,0 +1,130 @@
+import pytest
+from qdrant_client import QdrantClient
+from qdrant_client.http.models import Distance, VectorParams, PointStruct
+
+from app import vectorstore as vs
+
+
+def _conditions(flt):
+    return {c.key: c for c in flt.must}
+
+
+def test_build_filter_empty():
+    assert vs.build_filter() is None
+
+
+def test_build_filter_normalises_file_type():
+    flt = vs.build_filter(owner="alice", source="a.pdf", file_type=".PDF")
+    conds = _conditions(flt)
+    assert conds["owner"].match.value == "alice"
+    assert conds["filename"].match.value == "a.pdf"
+    assert conds["file_type"].match.value == "pdf"
+
+
+def test_build_filter_open_ended_dates():
+    after = _conditions(vs.build_filter(created_after=100.0))["created_at"].range
+    assert (after.gte, after.lte) == (100.0, None)
+    before = _conditions(vs.build_filter(created_before=200.0))["created_at"].range
+    assert (before.gte, before.lte) == (None, 200.0)
+
+
+class _FlakyClient:
+    def __init__(self, fail_first):
+        self.fail_first = fail_first
+        self.calls = 0
+
+    def create_payload_index(self, **kwargs):
+        self.calls += 1
+        if self.fail_first and self.calls == 1:
+            raise RuntimeError("qdrant unavailable")
+
+
+def test_payload_indexes_retried_after_failure():
+    vs._indexed_collections.discard("flaky")
+    client = _FlakyClient(fail_first=True)
+    vs.ensure_payload_indexes(client, "flaky")
+    assert "flaky" not in vs._indexed_collections
+    vs.ensure_payload_indexes(client, "flaky")
+    assert "flaky" in vs._indexed_collections
+    calls = client.calls
+    vs.ensure_payload_indexes(client, "flaky")
+    assert client.calls == calls
+
+
+def test_backfill_payload(monkeypatch, tmp_path):
+    client = QdrantClient(":memory:")
+    monkeypatch.setattr(vs, "get_client", lambda: client)
+    client.create_collection(vs.COLLECTION, vectors_config=VectorParams(size=2, distance=Distance.COSINE))
+    src = tmp_path / "Report.PDF"
+    src.write_text("x")
+    client.upsert(vs.COLLECTION, points=[
+        PointStruct(id=1, vector=[1.0, 0.0], payload={"owner": "a", "source": str(src)}),
+        PointStruct(id=2, vector=[0.0, 1.0], payload={"owner": "a", "source": "gone/notes.md"}),
+        PointStruct(id=3, vector=[1.0, 1.0], payload={
+            "owner": "a", "source": "new.txt", "filename": "new.txt", "file_type": "txt", "created_at": 5.0,
+        }),
+    ])
+
+    assert vs.backfill_payload() == {"sources": 2}
+
+    points = {p.id: p.payload for p in client.retrieve(vs.COLLECTION, ids=[1, 2, 3])}
+    assert points[1]["filename"] == "Report.PDF"
+    assert points[1]["file_type"] == "pdf"
+    assert points[1]["created_at"] == src.stat().st_mtime
+    assert points[2]["file_type"] == "md"
+    assert points[3]["created_at"] == 5.0
+
+
+def test_migrate_dense_to_sparse_skips_dense_model_vectors(monkeypatch):
+    client = QdrantClient(":memory:")
+    monkeypatch.setattr(vs, "get_client", lambda: client)
+    client.create_collection(vs.COLLECTION, vectors_config=VectorParams(size=8, distance=Distance.COSINE))
+    client.upsert(vs.COLLECTION, points=[
+        PointStruct(id=1, vector=[0.6, 0, 0, 0.8, 0, 0, 0, 0], payload={"owner": "a", "text": "hashed"}),
+        PointStruct(id=2, vector=[0.1, 0.2, 0.3, 0.1, 0.2, 0.3, 0.1, 0.2], payload={"owner": "a", "text": "openai"}),
+    ])
+
+    assert vs.migrate_dense_to_sparse(batch_size=1) == {"migrated": 1, "skipped": 1}
+
+    records = client.retrieve(vs.SPARSE_COLLECTION, ids=[1, 2], with_vectors=True)
+    assert [r.id for r in records] == [1]
+    sv = records[0].vector[vs.SPARSE_VECTOR]
+    assert sv.indices == [0, 3]
+    assert records[0].payload["text"] == "hashed"
+
+
+def test_sparse_search_respects_owner(monkeypatch):
+    client = QdrantClient(":memory:")
+    monkeypatch.setattr(vs, "get_client", lambda: client)
+    vs.upsert_embeddings(
+        [{"indices": [1, 5], "values": [0.6, 0.8]}, {"indices": [1], "values": [1.0]}],
+        [{"owner": "a", "text": "mine"}, {"owner": "b", "text": "theirs"}],
+    )
+    hits = vs.search({"indices": [1], "values": [1.0]}, top_k=5, owner="a")
+    assert [m["text"] for m, _ in hits] == ["mine"]
+
+
+def test_dense_search_respects_owner(monkeypatch):
+    client = QdrantClient(":memory:")
+    monkeypatch.setattr(vs, "get_client", lambda: client)
+    vs.upsert_embeddings(
+        [[1.0, 0.0], [1.0, 0.1], [0.0, 1.0]],
+        [{"owner": "a", "text": "mine"}, {"owner": "b", "text": "theirs"}, {"owner": "a", "text": "mine too"}],
+    )
+    hits = vs.search([1.0, 0.0], top_k=5, owner="a")
+    assert [m["text"] for m, _ in hits] == ["mine", "mine too"]
+    assert {m["owner"] for m, _ in vs.search([1.0, 0.0], top_k=5)} == {"a", "b"}
+
+
+def test_sparse_upsert_error_keeps_collection(monkeypatch):
+    client = QdrantClient(":memory:")
+    monkeypatch.setattr(vs, "get_client", lambda: client)
+    vs.upsert_embeddings([{"indices": [1], "values": [1.0]}], [{"owner": "a", "text": "kept"}])
+
+    def failing_upsert(**kwargs):
+        raise RuntimeError("connection reset")
+
+    monkeypatch.setattr(client, "upsert", failing_upsert)
+    with pytest.raises(RuntimeError, match="connection reset"):
+        vs.upsert_embeddings([{"indices": [2], "values": [1.0]}], [{"owner": "b", "text": "new"}])
+    assert client.count(vs.SPARSE_COLLECTION).count == 1
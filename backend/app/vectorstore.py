@@ -1,12 +1,49 @@
+import argparse
 import os
+import time
 import uuid
-from typing import List, Tuple
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
 
 from qdrant_client import QdrantClient
-from qdrant_client.http.models import Distance, VectorParams, PointStruct
+from qdrant_client.http.models import (
+    Distance,
+    VectorParams,
+    PointStruct,
+    Filter,
+    FieldCondition,
+    MatchValue,
+    Range,
+    IsEmptyCondition,
+    PayloadField,
+    PayloadSchemaType,
+    SparseVector,
+    SparseVectorParams,
+    SparseIndexParams,
+    NamedSparseVector,
+)
 from qdrant_client.http.exceptions import UnexpectedResponse
 
+from .llm import Embedding, SparseEmbedding
+
 COLLECTION = "ai_knowledge_hub"
+# Sparse hashing embeddings (FALLBACK_EMBED_SPARSE) live in their own collection,
+# searched by sparse dot product over Qdrant's inverted index.
+SPARSE_COLLECTION = f"{COLLECTION}_sparse"
+SPARSE_VECTOR = "text"
+
+# Payload fields used in search filters; indexed so Qdrant can plan filtered
+# queries from the index instead of scanning every point. `source` is indexed
+# for the payload backfill, which updates points per source file.
+PAYLOAD_INDEXES = {
+    "owner": PayloadSchemaType.KEYWORD,
+    "source": PayloadSchemaType.KEYWORD,
+    "filename": PayloadSchemaType.KEYWORD,
+    "file_type": PayloadSchemaType.KEYWORD,
+    "created_at": PayloadSchemaType.FLOAT,
+}
+
+_indexed_collections: set = set()
 
 
 def get_client() -> QdrantClient:
@@ -22,10 +59,66 @@ def ensure_collection(client: QdrantClient, dim: int = 1536) -> bool:
             collection_name=COLLECTION,
             vectors_config=VectorParams(size=dim, distance=Distance.COSINE),
         )
+        _indexed_collections.discard(COLLECTION)
+        ensure_payload_indexes(client)
         return True
+    ensure_payload_indexes(client)
     return False
 
 
+def _create_sparse_collection(client: QdrantClient) -> None:
+    client.create_collection(
+        collection_name=SPARSE_COLLECTION,
+        vectors_config={},
+        sparse_vectors_config={SPARSE_VECTOR: SparseVectorParams(index=SparseIndexParams(on_disk=False))},
+    )
+    _indexed_collections.discard(SPARSE_COLLECTION)
+    ensure_payload_indexes(client, SPARSE_COLLECTION)
+
+
+def ensure_sparse_collection(client: QdrantClient) -> bool:
+    existing = [c.name for c in client.get_collections().collections]
+    if SPARSE_COLLECTION not in existing:
+        _create_sparse_collection(client)
+        return True
+    ensure_payload_indexes(client, SPARSE_COLLECTION)
+    return False
+
+
+def ensure_payload_indexes(client: QdrantClient, collection: str = COLLECTION) -> None:
+    # create_payload_index is idempotent; the collection is only remembered once
+    # every index exists, so a transient error is retried on the next call.
+    if collection in _indexed_collections:
+        return
+    ok = True
+    for field, schema in PAYLOAD_INDEXES.items():
+        try:
+            client.create_payload_index(
+                collection_name=collection,
+                field_name=field,
+                field_schema=schema,
+            )
+        except Exception as e:
+            ok = False
+            print(f"[vectorstore] payload index {collection}.{field} failed: {e}")
+    if ok:
+        _indexed_collections.add(collection)
+
+
+def source_fields(path: str) -> dict:
+    """Filterable payload fields derived from a chunk's source path."""
+    p = Path(path)
+    return {"filename": p.name, "file_type": p.suffix.lower().lstrip(".")}
+
+
+def _is_sparse(vec: Embedding) -> bool:
+    return isinstance(vec, dict)
+
+
+def _to_sparse(vec: SparseEmbedding) -> SparseVector:
+    return SparseVector(indices=list(vec["indices"]), values=list(vec["values"]))
+
+
 def _recreate_collection(client: QdrantClient, dim: int) -> None:
     try:
         client.delete_collection(collection_name=COLLECTION)
@@ -35,10 +128,49 @@ def _recreate_collection(client: QdrantClient, dim: int) -> None:
         collection_name=COLLECTION,
         vectors_config=VectorParams(size=dim, distance=Distance.COSINE),
     )
+    _indexed_collections.discard(COLLECTION)
+    ensure_payload_indexes(client)
+
+
+def build_filter(
+    owner: Optional[str] = None,
+    source: Optional[str] = None,
+    file_type: Optional[str] = None,
+    created_after: Optional[float] = None,
+    created_before: Optional[float] = None,
+) -> Optional[Filter]:
+    """Translate search filters into a Qdrant payload filter.
 
+    `source` is the file name as shown in citations, `file_type` the extension
+    without the dot and the date bounds are unix timestamps.
+    """
+    must = []
+    if owner:
+        must.append(FieldCondition(key="owner", match=MatchValue(value=owner)))
+    if source:
+        must.append(FieldCondition(key="filename", match=MatchValue(value=source)))
+    if file_type:
+        ext = file_type.lower().lstrip(".")
+        must.append(FieldCondition(key="file_type", match=MatchValue(value=ext)))
+    if created_after is not None or created_before is not None:
+        must.append(FieldCondition(key="created_at", range=Range(gte=created_after, lte=created_before)))
+    return Filter(must=must) if must else None
 
-def upsert_embeddings(embeddings: List[List[float]], metadatas: List[dict]) -> None:
+
+def upsert_embeddings(embeddings: List[Embedding], metadatas: List[dict]) -> None:
     client = get_client()
+    if embeddings and _is_sparse(embeddings[0]):
+        ensure_sparse_collection(client)
+        points = [
+            PointStruct(id=str(uuid.uuid4()), vector={SPARSE_VECTOR: _to_sparse(v)}, payload=m)
+            for v, m in zip(embeddings, metadatas)
+        ]
+        # The sparse schema is fixed, so unlike the dense path there is no dimension
+        # mismatch to recover from; errors go to the caller instead of wiping the
+        # shared collection.
+        client.upsert(collection_name=SPARSE_COLLECTION, points=points)
+        return
+
     dim = len(embeddings[0]) if embeddings else 1536
     ensure_collection(client, dim=dim)
 
@@ -54,8 +186,20 @@ def upsert_embeddings(embeddings: List[List[float]], metadatas: List[dict]) -> N
         client.upsert(collection_name=COLLECTION, points=points)
 
 
-def search(query_vec: List[float], top_k: int = 5) -> List[Tuple[dict, float]]:
+def search(
+    query_vec: Embedding,
+    top_k: int = 5,
+    owner: Optional[str] = None,
+    source: Optional[str] = None,
+    file_type: Optional[str] = None,
+    created_after: Optional[float] = None,
+    created_before: Optional[float] = None,
+) -> List[Tuple[dict, float]]:
     client = get_client()
+    query_filter = build_filter(owner, source, file_type, created_after, created_before)
+    if _is_sparse(query_vec):
+        return _search_sparse(client, query_vec, top_k, query_filter)
+
     dim = len(query_vec) if query_vec else 1536
 
     created = ensure_collection(client, dim=dim)
@@ -66,6 +210,7 @@ def search(query_vec: List[float], top_k: int = 5) -> List[Tuple[dict, float]]:
         res = client.search(
             collection_name=COLLECTION,
             query_vector=query_vec,
+            query_filter=query_filter,
             limit=top_k,
         )
         return [(r.payload, float(r.score)) for r in res]
@@ -76,3 +221,123 @@ def search(query_vec: List[float], top_k: int = 5) -> List[Tuple[dict, float]]:
         return []
     except Exception:
         return []
+
+
+def _search_sparse(
+    client: QdrantClient,
+    query_vec: SparseEmbedding,
+    top_k: int,
+    query_filter: Optional[Filter],
+) -> List[Tuple[dict, float]]:
+    if not query_vec.get("indices"):
+        return []
+    if ensure_sparse_collection(client):
+        return []
+    try:
+        res = client.search(
+            collection_name=SPARSE_COLLECTION,
+            query_vector=NamedSparseVector(name=SPARSE_VECTOR, vector=_to_sparse(query_vec)),
+            query_filter=query_filter,
+            limit=top_k,
+        )
+        return [(r.payload, float(r.score)) for r in res]
+    except Exception:
+        return []
+
+
+def migrate_dense_to_sparse(batch_size: int = 256, max_density: float = 0.5) -> Dict[str, int]:
+    """Copy hashing-fallback points from the dense collection into the sparse one.
+
+    Points keep their ids and payloads; only non-zero dimensions are carried
+    over. Vectors denser than `max_density` come from a real embedding model
+    and are skipped. The dense collection is left untouched.
+    """
+    client = get_client()
+    existing = [c.name for c in client.get_collections().collections]
+    if COLLECTION not in existing:
+        return {"migrated": 0, "skipped": 0}
+    ensure_sparse_collection(client)
+
+    migrated = skipped = 0
+    offset = None
+    while True:
+        records, offset = client.scroll(
+            collection_name=COLLECTION,
+            limit=batch_size,
+            offset=offset,
+            with_payload=True,
+            with_vectors=True,
+        )
+        points = []
+        for r in records:
+            vec = r.vector or []
+            indices = [i for i, v in enumerate(vec) if v]
+            if not indices or len(indices) > max_density * len(vec):
+                skipped += 1
+                continue
+            sv = SparseVector(indices=indices, values=[vec[i] for i in indices])
+            points.append(PointStruct(id=r.id, vector={SPARSE_VECTOR: sv}, payload=r.payload))
+        if points:
+            client.upsert(collection_name=SPARSE_COLLECTION, points=points)
+            migrated += len(points)
+        if offset is None:
+            break
+    return {"migrated": migrated, "skipped": skipped}
+
+
+def backfill_payload(collection: str = COLLECTION, batch_size: int = 256) -> Dict[str, int]:
+    """Add filename/file_type/created_at to points ingested before those fields existed.
+
+    Points are updated per `source` with set_payload. `created_at` falls back to
+    the source file's mtime, or the current time if the file is gone.
+    """
+    client = get_client()
+    missing = Filter(must=[IsEmptyCondition(is_empty=PayloadField(key="filename"))])
+    sources = set()
+    offset = None
+    while True:
+        records, offset = client.scroll(
+            collection_name=collection,
+            scroll_filter=missing,
+            limit=batch_size,
+            offset=offset,
+            with_payload=["source"],
+            with_vectors=False,
+        )
+        sources.update(r.payload.get("source") for r in records if (r.payload or {}).get("source"))
+        if offset is None:
+            break
+
+    for src in sources:
+        created_at = os.path.getmtime(src) if os.path.exists(src) else time.time()
+        client.set_payload(
+            collection_name=collection,
+            payload={**source_fields(src), "created_at": created_at},
+            points=Filter(must=[
+                FieldCondition(key="source", match=MatchValue(value=src)),
+                IsEmptyCondition(is_empty=PayloadField(key="filename")),
+            ]),
+        )
+    return {"sources": len(sources)}
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(prog="python -m app.vectorstore")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    bf = sub.add_parser("backfill-payload", help="add filter fields to points ingested before they existed")
+    bf.add_argument("--sparse", action="store_true", help="backfill the sparse fallback collection")
+    ms = sub.add_parser("migrate-sparse", help="copy dense hashing-fallback points into the sparse collection")
+    ms.add_argument("--batch-size", type=int, default=256)
+    ms.add_argument("--max-density", type=float, default=0.5)
+    args = ap.parse_args(argv)
+
+    if args.cmd == "backfill-payload":
+        res = backfill_payload(SPARSE_COLLECTION if args.sparse else COLLECTION)
+        print(f"backfilled payload for {res['sources']} sources")
+    elif args.cmd == "migrate-sparse":
+        res = migrate_dense_to_sparse(batch_size=args.batch_size, max_density=args.max_density)
+        print(f"migrated {res['migrated']} points, skipped {res['skipped']}")
+
+
+if __name__ == "__main__":
+    main()